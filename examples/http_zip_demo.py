@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 """Quick demo: list files in a remote ZIP and read one member."""
 import argparse
-import binascii
 import time
+import zlib
 from zipfile import ZipFile
 
 from http_range_reader import HTTPRangeReader
@@ -31,10 +31,16 @@ def main():
             target = args.member or next(i.filename for i in infos if not i.is_dir())
             print("Reading:", target)
             t0 = time.time()
-            data = zf.read(target)
+            # stream the member and CRC each block as it arrives: no full-size
+            # buffer and no second pass over the data
+            total = 0
+            crc_calc = 0
+            with zf.open(target) as fh:
+                for block in iter(lambda: fh.read(args.chunk_size), b""):
+                    crc_calc = zlib.crc32(block, crc_calc)
+                    total += len(block)
             dt = time.time() - t0
-            crc_calc = binascii.crc32(data) & 0xFFFFFFFF
-            print(f"Read {len(data)} bytes in {dt:.3f}s, CRC32={crc_calc:08x}")
+            print(f"Read {total} bytes in {dt:.3f}s, CRC32={crc_calc & 0xFFFFFFFF:08x}")
 
 
 if __name__ == "__main__":
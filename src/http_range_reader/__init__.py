@@ -1,3 +1,3 @@
-from .reader import HTTPRangeReader
+from .reader import HTTPRangeError, HTTPRangeReader, StaleResourceError, TransportError
 
-__all__ = ["HTTPRangeReader"]
+__all__ = ["HTTPRangeError", "HTTPRangeReader", "StaleResourceError", "TransportError"]
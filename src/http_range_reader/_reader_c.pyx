@@ -0,0 +1,36 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Optional C accelerator for HTTPRangeReader.readinto().
+
+Build in place with ``cythonize -i src/http_range_reader/_reader_c.pyx``;
+reader.py falls back to an equivalent pure-Python loop when it is absent.
+"""
+from libc.string cimport memcpy
+
+
+def readinto_chunks(unsigned char[::1] dst, Py_ssize_t pos, Py_ssize_t size,
+                    object cache, Py_ssize_t cache_start, Py_ssize_t cache_end,
+                    object miss):
+    """
+    Copy ``len(dst)`` bytes starting at ``pos`` out of the current chunk window,
+    calling ``miss(pos) -> (cache, cache_start, cache_end)`` only when ``pos``
+    leaves the window. Returns the number of bytes written.
+    """
+    cdef Py_ssize_t n = dst.shape[0]
+    cdef Py_ssize_t written = 0
+    cdef Py_ssize_t available, to_read
+    cdef const unsigned char[::1] src = cache
+    while written < n and pos < size:
+        if not (cache_start <= pos < cache_end):
+            cache, cache_start, cache_end = miss(pos)
+            src = cache
+            if cache_end <= pos:
+                break
+        available = cache_end - pos
+        to_read = n - written
+        if available < to_read:
+            to_read = available
+        memcpy(&dst[written], &src[pos - cache_start], to_read)
+        pos += to_read
+        written += to_read
+    return written
@@ -1,23 +1,652 @@
+import hashlib
 import io
+import mmap
+import os
+import queue
 import re
+import struct
 import threading
-from concurrent.futures import ThreadPoolExecutor, Future
-from collections import OrderedDict
-from typing import Optional, Tuple
+import warnings
+import weakref
+from typing import Dict, List, Optional, Protocol, Set, Tuple, Union
 
-import requests
-from requests.adapters import HTTPAdapter
+import urllib3
 from urllib3.util.retry import Retry
 
+try:  # optional: HTTP/2 transport
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore[assignment]
+
+try:  # optional: only used when the caller injects a requests.Session
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # pragma: no cover
+    requests = None  # type: ignore[assignment]
+    HTTPAdapter = None  # type: ignore[assignment,misc]
+
+
+# a chunk payload: read_exact() fills a preallocated bytearray
+_Blob = Union[bytes, bytearray]
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+_BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+
+
+def _parse_content_range(value: Optional[str]) -> Optional[Tuple[int, int, Optional[int]]]:
+    """Parse ``bytes a-b/total`` into (a, b, total); total is None for ``*``."""
+    if not value:
+        return None
+    m = _CONTENT_RANGE_RE.match(value.strip())
+    if not m:
+        return None
+    total = None if m.group(3) == "*" else int(m.group(3))
+    return int(m.group(1)), int(m.group(2)), total
+
+
+def _parse_byteranges(body: bytes, boundary: str) -> List[Tuple[int, bytes]]:
+    """
+    Split a ``multipart/byteranges`` body into [(start, blob), ...].
+    Part payloads are sliced by their Content-Range length, so binary data that
+    happens to contain the boundary string is handled correctly.
+    """
+    delim = b"--" + boundary.encode("latin-1")
+    parts: List[Tuple[int, bytes]] = []
+    pos = body.find(delim)
+    while pos != -1:
+        pos += len(delim)
+        if body[pos:pos + 2] == b"--":
+            break
+        hdr_end = body.find(b"\r\n\r\n", pos)
+        if hdr_end == -1:
+            break
+        crange = None
+        for line in body[pos:hdr_end].split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-range":
+                crange = _parse_content_range(value.decode("latin-1"))
+        if crange is None:
+            raise ValueError("multipart/byteranges part without Content-Range")
+        start, end, _ = crange
+        data_start = hdr_end + 4
+        data_end = data_start + (end - start + 1)
+        parts.append((start, body[data_start:data_end]))
+        pos = body.find(delim, data_end)
+    return parts
+
+
+def _readinto_chunks_py(dst, pos, size, cache, cache_start, cache_end, miss) -> int:
+    """Pure-Python twin of ``_reader_c.readinto_chunks``."""
+    n = len(dst)
+    written = 0
+    src = memoryview(cache)
+    while written < n and pos < size:
+        if not (cache_start <= pos < cache_end):
+            cache, cache_start, cache_end = miss(pos)
+            src = memoryview(cache)
+            if cache_end <= pos:
+                break
+        offset = pos - cache_start
+        available = cache_end - pos
+        remaining = n - written
+        to_read = available if available < remaining else remaining
+        dst[written:written + to_read] = src[offset:offset + to_read]
+        pos += to_read
+        written += to_read
+    return written
+
+
+try:  # optional C accelerator (see _reader_c.pyx)
+    from ._reader_c import readinto_chunks as _readinto_chunks
+except ImportError:
+    _readinto_chunks = _readinto_chunks_py
+
+
+class HTTPRangeError(IOError):
+    """Unexpected HTTP status from the remote server."""
+
+    def __init__(self, status: int, url: str, reason: str = "") -> None:
+        super().__init__(f"HTTP {status} for {url}" + (f": {reason}" if reason else ""))
+        self.status = status
+        self.url = url
+
+
+class StaleResourceError(IOError):
+    """The remote resource changed and the server keeps answering ranged GETs with 200."""
+
+
+class TransportError(IOError):
+    """Connection, timeout or protocol failure while talking to the server."""
+
+
+class _Response:
+    """Transport-neutral response: status, case-insensitive headers, lazy body."""
+
+    __slots__ = ("status", "headers", "url", "_raw", "_read", "_close", "_errors")
+
+    def __init__(self, status, headers, url, raw, read, close, errors=()) -> None:
+        self.status = status
+        self.headers = headers
+        self.url = url
+        self._raw = raw
+        self._read = read
+        self._close = close
+        # transport exceptions raised while reading the body; surfaced as TransportError
+        self._errors = errors
+
+    def read(self) -> bytes:
+        try:
+            return self._read()
+        except self._errors as e:
+            raise TransportError(f"reading {self.url}: {e}") from e
+
+    def readinto(self, b) -> int:
+        try:
+            return self._raw.readinto(b)
+        except self._errors as e:
+            raise TransportError(f"reading {self.url}: {e}") from e
+
+    def body_length(self) -> Optional[int]:
+        """Exact payload size from Content-Range (206) or Content-Length, if known."""
+        crange = _parse_content_range(self.headers.get("Content-Range"))
+        if crange is not None:
+            return crange[1] - crange[0] + 1
+        cl = self.headers.get("Content-Length")
+        if cl and cl.isdigit():
+            return int(cl)
+        return None
+
+    def read_exact(self) -> _Blob:
+        """Stream the body into one preallocated buffer (no intermediate joins)."""
+        count = self.body_length()
+        if count is None:
+            return self.read()
+        buf = bytearray(count)
+        mv = memoryview(buf)
+        off = 0
+        try:
+            while off < count:
+                k = self._raw.readinto(mv[off:])
+                if not k:
+                    break
+                off += k
+        except self._errors as e:
+            raise TransportError(f"reading {self.url}: {e}") from e
+        finally:
+            mv.release()
+        if off < count:
+            # never hand back (and cache) a silently truncated chunk
+            raise TransportError(f"reading {self.url}: got {off} of {count} bytes")
+        return buf
+
+    def close(self) -> None:
+        self._close()
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            self.close()
+            raise HTTPRangeError(self.status, self.url)
+
+
+def _retry_policy(max_retries: int, backoff: float) -> Retry:
+    return Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        backoff_factor=backoff,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=("HEAD", "GET"),
+        raise_on_status=False,
+    )
+
+
+class _Urllib3Transport:
+    """Default transport: one urllib3 pool reused for every request."""
+
+    def __init__(self, max_retries: int, backoff: float, maxsize: int) -> None:
+        self.pool = urllib3.PoolManager(
+            num_pools=1, maxsize=maxsize, retries=_retry_policy(max_retries, backoff)
+        )
+
+    def request(self, method: str, url: str, headers: dict, timeout: float) -> _Response:
+        try:
+            r = self.pool.request(
+                method, url, headers=headers, timeout=timeout, preload_content=False
+            )
+        except urllib3.exceptions.HTTPError as e:
+            raise TransportError(f"{method} {url}: {e}") from e
+
+        def release() -> None:
+            if r.length_remaining == 0 or r.closed:
+                r.drain_conn()  # body fully read: the connection is idle, reuse it
+            else:  # unread or unknown-length body: drop the connection, don't download it
+                r.close()
+                r.release_conn()
+
+        return _Response(
+            r.status, r.headers, url, r, r.read, release, (urllib3.exceptions.HTTPError,)
+        )
+
+    def close(self) -> None:
+        self.pool.clear()
+
+
+class _RequestsTransport:
+    """Fallback transport for a caller-supplied requests.Session."""
+
+    def __init__(self, session, max_retries: int, backoff: float, owned: bool) -> None:
+        self.session = session
+        self.owned = owned
+        adapter = HTTPAdapter(max_retries=_retry_policy(max_retries, backoff))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    def request(self, method: str, url: str, headers: dict, timeout: float) -> _Response:
+        # requests' own exceptions are IOErrors already; raw reads raise urllib3's
+        r = self.session.request(method, url, headers=headers, timeout=timeout, stream=True)
+        return _Response(
+            r.status_code, r.headers, url, r.raw, lambda: r.content, r.close,
+            (urllib3.exceptions.HTTPError,),
+        )
+
+    def close(self) -> None:
+        if self.owned:
+            self.session.close()
+
+
+class _HttpxStream:
+    """readinto() over an httpx streaming response's raw byte iterator."""
+
+    __slots__ = ("_it", "_pending")
+
+    def __init__(self, response) -> None:
+        self._it = response.iter_raw()
+        self._pending = memoryview(b"")
+
+    def readinto(self, b) -> int:
+        if not self._pending:
+            self._pending = memoryview(next(self._it, b""))
+        k = min(len(b), len(self._pending))
+        b[:k] = self._pending[:k]
+        self._pending = self._pending[k:]
+        return k
+
+
+class _HttpxTransport:
+    """HTTP/2 transport: prefetch GETs multiplex as streams on a single connection."""
+
+    def __init__(self, max_retries: int) -> None:
+        if httpx is None:
+            raise ImportError("transport='httpx2' requires httpx: pip install 'httpx[http2]'")
+        limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+        self.client = httpx.Client(
+            transport=httpx.HTTPTransport(http2=True, retries=max_retries, limits=limits),
+            follow_redirects=True,
+        )
+
+    def request(self, method: str, url: str, headers: dict, timeout: float) -> _Response:
+        req = self.client.build_request(method, url, headers=headers, timeout=timeout)
+        try:
+            r = self.client.send(req, stream=True)
+        except httpx.HTTPError as e:
+            raise TransportError(f"{method} {url}: {e}") from e
+        return _Response(
+            r.status_code, r.headers, url, _HttpxStream(r), r.read, r.close, (httpx.HTTPError,)
+        )
+
+    def close(self) -> None:
+        self.client.close()
+
+
+_TRANSPORTS = ("urllib3", "httpx2")
+
+
+class _Transport(Protocol):
+    def request(self, method: str, url: str, headers: dict, timeout: float) -> _Response: ...
+
+    def close(self) -> None: ...
+
+
+class _Slot:
+    """One queued read-ahead GET; ``event`` is set once its result is in ``_ready``."""
+
+    __slots__ = ("start", "end", "event", "cancelled")
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.end = end
+        self.event = threading.Event()
+        self.cancelled = False
+
+
+def _prefetch_worker(reader_ref, task_q, ready) -> None:
+    # persistent worker: one queue get per task, no Future bookkeeping. The
+    # reader is only referenced while a task runs.
+    while True:
+        slot = task_q.get()
+        if slot is None:
+            return
+        reader = reader_ref()
+        if reader is None:
+            return
+        if not slot.cancelled:
+            gen = reader._generation
+            try:
+                blob = reader._range_get(slot.start, slot.end, private_headers=True)
+            except Exception:
+                blob = b""  # the reader refetches synchronously and surfaces the error
+            if blob:
+                ready.put((slot.start, blob, gen))
+        del reader
+        slot.event.set()
+
+
+class _Node:
+    __slots__ = ("key", "value", "prev", "next")
+
+    def __init__(self, key=None, value=None) -> None:
+        self.key = key
+        self.value = value
+        self.prev: "_Node" = self
+        self.next: "_Node" = self
+
+
+class _LRU:
+    """
+    Fixed-capacity LRU: {key: node} map + doubly-linked list with a sentinel.
+    Head side (sentinel.next) is most recently used.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = capacity
+        self._map: Dict[int, _Node] = {}
+        self._root = _Node()
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._map
+
+    def _unlink(self, node: _Node) -> None:
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def _push_front(self, node: _Node) -> None:
+        root = self._root
+        node.prev = root
+        node.next = root.next
+        root.next.prev = node
+        root.next = node
+
+    def get(self, key: int) -> Optional[_Blob]:
+        node = self._map.get(key)
+        if node is None:
+            return None
+        if self._root.next is not node:
+            self._unlink(node)
+            self._push_front(node)
+        return node.value
+
+    @property
+    def room(self) -> int:
+        return self.capacity
+
+    def put(self, key: int, value: _Blob) -> Optional[Tuple[int, _Blob]]:
+        """Insert or refresh ``key``; returns the evicted (key, value), if any."""
+        node = self._map.get(key)
+        if node is not None:
+            node.value = value
+            self._unlink(node)
+            self._push_front(node)
+            return None
+        evicted = None
+        if len(self._map) >= self.capacity:
+            tail = self._root.prev
+            self._unlink(tail)
+            del self._map[tail.key]
+            evicted = (tail.key, tail.value)
+        node = _Node(key, value)
+        self._map[key] = node
+        self._push_front(node)
+        return evicted
+
+    def pop(self, key: int) -> Optional[_Blob]:
+        node = self._map.pop(key, None)
+        if node is None:
+            return None
+        self._unlink(node)
+        return node.value
+
+    def clear(self) -> None:
+        self._map.clear()
+        self._root.prev = self._root.next = self._root
+
+
+class _SmallLRU:
+    """
+    LRU for small capacities: recency order is a flat list of keys (MRU at
+    index 0) beside a plain {key: value} map. No per-entry node objects; a
+    reorder is one C-level list scan, cheaper than relinking nodes for a
+    handful of entries.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = capacity
+        self._order: List[int] = []
+        self._values: Dict[int, _Blob] = {}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._values
+
+    def get(self, key: int) -> Optional[_Blob]:
+        value = self._values.get(key)
+        if value is not None and self._order[0] != key:
+            order = self._order
+            order.remove(key)
+            order.insert(0, key)
+        return value
+
+    @property
+    def room(self) -> int:
+        return self.capacity
+
+    def put(self, key: int, value: _Blob) -> Optional[Tuple[int, _Blob]]:
+        """Insert or refresh ``key``; returns the evicted (key, value), if any."""
+        order = self._order
+        evicted = None
+        if key in self._values:
+            order.remove(key)
+        elif len(order) >= self.capacity:
+            old = order.pop()
+            evicted = (old, self._values.pop(old))
+        order.insert(0, key)
+        self._values[key] = value
+        return evicted
+
+    def pop(self, key: int) -> Optional[_Blob]:
+        value = self._values.pop(key, None)
+        if value is not None:
+            self._order.remove(key)
+        return value
+
+    def clear(self) -> None:
+        self._order.clear()
+        self._values.clear()
+
+
+_SMALL_LRU_MAX = 8
+
+
+class _SegmentedLRU:
+    """
+    Segmented LRU (SLRU): new chunks enter a probation LRU and are promoted to
+    a protected LRU of ``capacity // 2`` entries on their second hit. A
+    sequential scan touches each chunk once, so it only ever churns probation
+    and can't evict chunks that are revisited (ZIP local headers, central
+    directory). Probation borrows whatever the protected segment isn't using;
+    entries falling out of protected are demoted back to probation.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 2:
+            raise ValueError("capacity must be >= 2")
+        self.capacity = capacity
+        self._protected = _plain_lru(capacity // 2)
+        self._probation = _plain_lru(capacity)
+        # probation keys hit once since they were stored
+        self._hit_once: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._protected) + len(self._probation)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._protected or key in self._probation
+
+    @property
+    def room(self) -> int:
+        """Entries a scan can add before it evicts its own earliest ones."""
+        return self._probation.capacity
+
+    def get(self, key: int) -> Optional[_Blob]:
+        value = self._protected.get(key)
+        if value is not None:
+            return value
+        value = self._probation.get(key)
+        if value is None:
+            return None
+        if key not in self._hit_once:
+            self._hit_once.add(key)
+            return value
+        # second hit: promote
+        self._hit_once.discard(key)
+        self._probation.pop(key)
+        demoted = self._protected.put(key, value)
+        if demoted is None:
+            self._probation.capacity -= 1  # protected grew into the borrowed slot
+        else:
+            self._probation.put(*demoted)
+        return value
+
+    def put(self, key: int, value: _Blob) -> None:
+        if key in self._protected:
+            self._protected.put(key, value)
+            return
+        evicted = self._probation.put(key, value)
+        if evicted is not None:
+            self._hit_once.discard(evicted[0])
+
+    def clear(self) -> None:
+        self._protected.clear()
+        self._probation.clear()
+        self._probation.capacity = self.capacity
+        self._hit_once.clear()
+
+
+class _DiskCache:
+    """
+    On-disk chunk store for one version of a resource: a sparse file the size of
+    the resource (chunks written at their own offset) plus an append-only index
+    of the chunk starts already written. Reads are served from an mmap, so a
+    hit costs no syscall. Owned by the reader thread.
+    """
+
+    def __init__(self, path_base: str, size: int, chunk_size: int) -> None:
+        self.size = size
+        self.chunk_size = chunk_size
+        data_path = path_base + ".bin"
+        fresh = not (os.path.exists(data_path) and os.path.getsize(data_path) == size)
+        self._f = open(data_path, "w+b" if fresh else "r+b")
+        if fresh:
+            self._f.truncate(size)
+        self._idx = open(path_base + ".idx", "w+b" if fresh else "a+b")
+        self._present: Set[int] = set()
+        if not fresh:
+            self._idx.seek(0)
+            raw = self._idx.read()
+            count = len(raw) // 8  # a torn trailing record is ignored
+            self._present.update(struct.unpack(f"<{count}q", raw[: count * 8]))
+        self._mm = mmap.mmap(self._f.fileno(), size)
+
+    @classmethod
+    def open(cls, cache_dir: str, url: str, validator: str, size: int, chunk_size: int):
+        os.makedirs(cache_dir, exist_ok=True)
+        key = f"{url}\0{validator}\0{size}\0{chunk_size}".encode("utf-8", "surrogatepass")
+        return cls(os.path.join(cache_dir, hashlib.sha256(key).hexdigest()[:32]), size, chunk_size)
+
+    def __contains__(self, start: int) -> bool:
+        return start in self._present
+
+    def _chunk_len(self, start: int) -> int:
+        return min(self.chunk_size, self.size - start)
+
+    def get(self, start: int) -> Optional[bytes]:
+        if start not in self._present:
+            return None
+        return self._mm[start:start + self._chunk_len(start)]
+
+    def put(self, start: int, blob: _Blob) -> None:
+        if start in self._present or len(blob) != self._chunk_len(start):
+            return
+        if hasattr(os, "pwrite"):
+            with memoryview(blob) as mv:
+                off = 0
+                while off < len(mv):
+                    k = os.pwrite(self._f.fileno(), mv[off:], start + off)
+                    if k <= 0:
+                        raise OSError(f"short write to chunk cache at {start + off}")
+                    off += k
+        else:  # pragma: no cover - Windows
+            self._f.seek(start)
+            self._f.write(blob)
+            self._f.flush()
+        # data first, then the index record, so a killed process never indexes
+        # unwritten bytes (no fsync: a power loss can still leave a stale index)
+        self._idx.write(struct.pack("<q", start))
+        self._idx.flush()
+        self._present.add(start)
+
+    def close(self) -> None:
+        self._mm.close()
+        self._f.close()
+        self._idx.close()
+
+
+def _plain_lru(capacity: int):
+    """Pick the list-backed LRU for small capacities, the linked one otherwise."""
+    if capacity <= _SMALL_LRU_MAX:
+        return _SmallLRU(capacity)
+    return _LRU(capacity)
+
+
+def _new_lru(capacity: int):
+    """Chunk cache for the reader: segmented when there is room for two segments."""
+    if capacity < 2:
+        return _plain_lru(capacity)
+    return _SegmentedLRU(capacity)
+
 
 class HTTPRangeReader(io.RawIOBase):
     """
     HTTP byte-range reader with:
-      • 2-chunk LRU cache (current + previous)
-      • Parallel prefetch of the next chunk (single worker)
+      • N-chunk LRU cache (default 8 chunks); power-of-two ``chunk_size`` is fastest
+      • Tail (ZIP EOCD/central directory) fetched with one suffix-range GET at open
+      • Pipelined read-ahead of the next ``prefetch_depth`` chunks
+      • Large reads fetch their chunks in parallel (up to ``max_inflight`` GETs)
+      • Multi-range (multipart/byteranges) GETs for reads spanning missing chunks
       • Robust size detection and range validation
-      • If-Range with ETag/Last-Modified
-      • Retries + connection pooling (requests.Session)
+      • If-Range with ETag/Last-Modified; a changed resource flushes the cache and
+        the range is re-requested instead of downloading the whole new body
+      • Retries + connection pooling (urllib3 pool; requests.Session if injected)
+      • Optional on-disk chunk cache (``cache_dir``) reused across readers/runs
+      • Optional HTTP/2 transport (``transport="httpx2"``) multiplexing prefetches
 
     Python: 3.9+
     Thread safety: not guaranteed; intended for one reader at a time.
@@ -27,37 +656,51 @@ class HTTPRangeReader(io.RawIOBase):
         self,
         url: str,
         chunk_size: int = 1024 * 1024,
-        session: Optional[requests.Session] = None,
+        session: Optional["requests.Session"] = None,
         timeout: float = 10.0,
         max_retries: int = 3,
         backoff: float = 0.5,
         user_agent: str = "HTTPRangeReader/2.0",
         prefetch: bool = True,
+        lru_size: int = 8,
+        prefetch_depth: int = 2,
+        transport: str = "urllib3",
+        tail_prefetch_bytes: int = 65536,
+        cache_dir: Optional[str] = None,
+        max_inflight: int = 8,
     ) -> None:
         if chunk_size <= 0:
             raise ValueError("chunk_size must be > 0")
+        if lru_size <= 0:
+            raise ValueError("lru_size must be > 0")
+        if prefetch_depth <= 0:
+            raise ValueError("prefetch_depth must be > 0")
+        if max_inflight <= 0:
+            raise ValueError("max_inflight must be > 0")
+        # workers serve both read-ahead and large reads
+        max_inflight = max(max_inflight, prefetch_depth)
+        if transport not in _TRANSPORTS:
+            raise ValueError(f"transport must be one of {_TRANSPORTS}")
 
         self.url = url
         self.chunk_size = int(chunk_size)
+        # power-of-two chunk sizes take the bitmask path for chunk alignment
+        cs = self.chunk_size
+        self._chunk_mask: Optional[int] = cs - 1 if cs & (cs - 1) == 0 else None
         self.timeout = timeout
 
-        # Session & retries
+        # Transport & retries: an injected requests.Session wins, then the named transport
         self._external_session = session is not None
-        self.s = session or requests.Session()
-        adapter = HTTPAdapter(
-            max_retries=Retry(
-                total=max_retries,
-                connect=max_retries,
-                read=max_retries,
-                backoff_factor=backoff,
-                status_forcelist=(500, 502, 503, 504),
-                allowed_methods=("HEAD", "GET"),
-                raise_on_status=False,
-            )
-        )
-        self.s.mount("http://", adapter)
-        self.s.mount("https://", adapter)
-        self._base_headers = {"User-Agent": user_agent}
+        self._transport: _Transport
+        if session is not None:
+            self._transport = _RequestsTransport(session, max_retries, backoff, owned=False)
+        elif transport == "httpx2":
+            self._transport = _HttpxTransport(max_retries)
+        else:
+            self._transport = _Urllib3Transport(max_retries, backoff, maxsize=max_inflight + 1)
+        # identity encoding: Content-Range must describe the bytes we actually receive
+        self._base_headers = {"User-Agent": user_agent, "Accept-Encoding": "identity"}
+        self._range_headers = dict(self._base_headers)
 
         # Stream state
         self.pos = 0
@@ -65,26 +708,51 @@ class HTTPRangeReader(io.RawIOBase):
         self._accept_ranges = False
         self._etag = None
         self._last_modified = None
+        # bumped (by any thread) when If-Range reveals the resource changed;
+        # the reader flushes everything cached under an older generation
+        self._generation = 0
+        self._cache_generation = 0
 
-        # 2-chunk LRU {chunk_start: bytes}
-        self._lru: "OrderedDict[int, bytes]" = OrderedDict()
+        # chunk LRU {chunk_start: bytes}; ZIP access touches EOCD, CD and
+        # local headers, so keep more than two regions warm
+        self._lru = _new_lru(lru_size)
 
         # Current window (compat with simple reader logic)
-        self.cache = b""
+        self.cache: _Blob = b""
         self.cache_start = 0
         self.cache_end = 0
 
+        # (start, blob) for the file tail fetched at open; not chunk-aligned, so
+        # it lives beside the LRU rather than in it
+        self._tail_prefetch_bytes = tail_prefetch_bytes
+        self._tail: Optional[Tuple[int, _Blob]] = None
+
+        # optional on-disk chunk cache, keyed by (url, validator); opened once
+        # the size and ETag/Last-Modified are known
+        self._cache_dir = cache_dir
+        self._disk: Optional[_DiskCache] = None
+
         # Prefetch infra
         self._prefetch_enabled = prefetch
-        self._prefetch_pool: Optional[ThreadPoolExecutor] = (
-            ThreadPoolExecutor(max_workers=1, thread_name_prefix="hrr-prefetch")
-            if self._prefetch_enabled
-            else None
-        )
-        self._next_future: Optional[Future] = None
-        self._lock = threading.Lock()
+        self._prefetch_depth = prefetch_depth
+        self._max_inflight = max_inflight
+        # exclusive end of the large read in progress; widens the fetch window
+        self._want_end = 0
+        # {chunk_start: _Slot} for read-ahead GETs queued or in flight; only
+        # _inflight is shared state. The LRU is owned by the reader thread and
+        # workers hand finished chunks over through _ready.
+        self._inflight: Dict[int, _Slot] = {}
+        self._prefetch_lock = threading.Lock()
+        self._task_q: "queue.SimpleQueue[Optional[_Slot]]" = queue.SimpleQueue()
+        self._ready: "queue.SimpleQueue[Tuple[int, bytes, int]]" = queue.SimpleQueue()
+        # started by the first _queue_prefetch, so a failed open leaves no threads
+        self._workers: List[threading.Thread] = []
 
-        self._init_remote()
+        try:
+            self._init_remote()
+        except BaseException:
+            self.close()
+            raise
 
     # io.RawIOBase
     def readable(self) -> bool:
@@ -110,55 +778,152 @@ class HTTPRangeReader(io.RawIOBase):
         elif new_pos > self.size:
             new_pos = self.size
         self.pos = new_pos
+        if self._inflight:
+            self._cancel_prefetch_outside(new_pos)
         return self.pos
 
     def read(self, n: int = -1) -> bytes:
-        if n is None or n < 0:
-            n = self.size - self.pos
-        if n == 0 or self.pos >= self.size:
+        avail = self.size - self.pos
+        if n is None or n < 0 or n > avail:
+            n = avail
+        if n <= 0:
             return b""
-        out = bytearray()
-        remaining = n
-        while remaining > 0 and self.pos < self.size:
-            if not (self.cache_start <= self.pos < self.cache_end):
-                self._fetch_chunk(self.pos)
-            offset = self.pos - self.cache_start
-            available = self.cache_end - self.pos
-            to_read = available if available < remaining else remaining
-            out += self.cache[offset:offset + to_read]
-            self.pos += to_read
-            remaining -= to_read
+        out = bytearray(n)
+        written = self.readinto(out)
+        if written < n:
+            return bytes(memoryview(out)[:written])
         return bytes(out)
 
+    def read1(self, size: int = -1) -> bytes:
+        """
+        Read up to ``size`` bytes, stopping at the end of the cached chunk.
+        Performs at most one fetch; a negative ``size`` returns the rest of
+        the chunk.
+        """
+        if size == 0 or self.pos >= self.size:
+            return b""
+        if not (self.cache_start <= self.pos < self.cache_end):
+            self._fetch_chunk(self.pos)
+            if not (self.cache_start <= self.pos < self.cache_end):
+                return b""
+        end = self.cache_end
+        if size is not None and size >= 0:
+            end = min(end, self.pos + size)
+        # chunks may be bytearrays: copy the requested slice out as bytes
+        with memoryview(self.cache) as mv:
+            out = bytes(mv[self.pos - self.cache_start:end - self.cache_start])
+        self.pos = end
+        return out
+
     def readinto(self, b) -> int:
-        mv = memoryview(b)
+        # copy straight from the cached chunk into the caller's buffer
+        mv = memoryview(b).cast("B")
         n = len(mv)
         if n == 0:
             return 0
-        data = self.read(n)
-        mv[: len(data)] = data
-        return len(data)
+        if self._accept_ranges:
+            last = min(self.pos + n, self.size) - 1
+            mask = self._chunk_mask
+            if mask is not None:
+                crosses = (last ^ self.pos) > mask
+            else:
+                crosses = last // self.chunk_size != self.pos // self.chunk_size
+            if crosses:
+                if n > 2 * self.chunk_size and self._prefetch_enabled:
+                    # large read: fetch the chunks it needs in parallel, not one RTT each
+                    self._want_end = last + 1
+                    in_window = self.cache_start <= self.pos < self.cache_end
+                    self._queue_prefetch(self.cache_end if in_window else self.pos)
+                else:
+                    self._coalesce_misses(self.pos, last)
+        try:
+            written = _readinto_chunks(
+                mv, self.pos, self.size, self.cache, self.cache_start, self.cache_end, self._miss
+            )
+        finally:
+            self._want_end = 0
+        self.pos += written
+        return written
 
     def close(self) -> None:
         try:
-            with self._lock:
-                if self._next_future is not None:
-                    try:
-                        self._next_future.cancel()
-                    except Exception:
-                        pass
-                    self._next_future = None
-                if self._prefetch_pool is not None:
-                    self._prefetch_pool.shutdown(wait=False, cancel_futures=True)
-            if not self._external_session:
-                self.s.close()
+            with self._prefetch_lock:
+                for slot in self._inflight.values():
+                    slot.cancelled = True
+                self._inflight.clear()
+            for _ in self._workers:
+                self._task_q.put(None)
+            self._workers = []
+            if self._transport is not None:
+                self._transport.close()
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
         finally:
             super().close()
 
     # internals
+    def _start_workers(self, n: int) -> None:
+        # workers hold the reader weakly: an unclosed reader can still be collected,
+        # and IOBase.__del__ -> close() then stops them
+        ref = weakref.ref(self)
+        for i in range(n):
+            t = threading.Thread(
+                target=_prefetch_worker,
+                args=(ref, self._task_q, self._ready),
+                name=f"hrr-prefetch-{i}",
+                daemon=True,
+            )
+            t.start()
+            self._workers.append(t)
+
+    def _request(self, method: str, headers: dict) -> _Response:
+        return self._transport.request(method, self.url, headers, self.timeout)
+
     def _init_remote(self) -> None:
-        h = self.s.head(self.url, headers=self._base_headers, timeout=self.timeout)
+        if not self._init_from_suffix_get():
+            # the server rejected the suffix GET (which doubles as the tail
+            # prefetch); asking again would fail the same way, so no tail
+            self._init_from_head()
+        self._open_disk_cache()
+
+    def _init_from_suffix_get(self) -> bool:
+        """
+        Learn size, validators and range support from one suffix-range GET,
+        keeping the body as the tail prefetch. Returns False (falling back to
+        HEAD + probe) when the server doesn't answer with a usable 206.
+        """
+        # No If-Range here: no validators are known yet.
+        n = max(self._tail_prefetch_bytes, 1)
+        r = self._request("GET", {**self._base_headers, "Range": f"bytes=-{n}"})
+        try:
+            if r.status in (200, 405, 416, 501):
+                return False  # closed unread: don't download a 200 body
+            r.raise_for_status()
+            if r.status != 206:
+                return False
+            crange = _parse_content_range(r.headers.get("Content-Range"))
+            if crange is None:
+                return False
+            start, end, total = crange
+            if total is None or end != total - 1:
+                return False
+            blob = r.read_exact()
+        finally:
+            r.close()
+        self.size = total
+        self._accept_ranges = True
+        self._etag = r.headers.get("ETag")
+        self._last_modified = r.headers.get("Last-Modified")
+        self._build_range_headers()
+        if self._tail_prefetch_bytes > 0 and len(blob) == self.size - start:
+            self._tail = (start, blob)
+        return True
+
+    def _init_from_head(self) -> None:
+        h = self._request("HEAD", self._base_headers)
         h.raise_for_status()
+        h.close()
         cl = h.headers.get("Content-Length")
         if cl:
             try:
@@ -168,90 +933,270 @@ class HTTPRangeReader(io.RawIOBase):
         self._accept_ranges = h.headers.get("Accept-Ranges", "").lower() == "bytes"
         self._etag = h.headers.get("ETag")
         self._last_modified = h.headers.get("Last-Modified")
+        self._build_range_headers()
         if self.size <= 0 or not self._accept_ranges:
             headers = {**self._base_headers, "Range": "bytes=0-0"}
-            r = self.s.get(self.url, headers=headers, timeout=self.timeout)
+            r = self._request("GET", headers)
             r.raise_for_status()
-            if r.status_code == 206:
-                cr = r.headers.get("Content-Range")
-                if cr:
-                    m = re.match(r"bytes\s+\d+-\d+/(\d+)", cr)
-                    if m:
-                        self.size = int(m.group(1))
-                self._accept_ranges = True
-            elif r.status_code == 200:
-                self._accept_ranges = False
-                self.size = len(r.content)
-                self._install_chunk(0, r.content)
-            else:
-                r.raise_for_status()
+            try:
+                if r.status == 206:
+                    crange = _parse_content_range(r.headers.get("Content-Range"))
+                    if crange is not None and crange[2] is not None:
+                        self.size = crange[2]
+                    self._accept_ranges = True
+                elif r.status == 200:
+                    body = r.read()
+                    self._accept_ranges = False
+                    self.size = len(body)
+                    self._install_chunk(0, body)
+                else:
+                    raise HTTPRangeError(r.status, self.url)
+            finally:
+                r.close()
         if self.size <= 0:
             raise ValueError("Unable to determine remote size")
         if not self._accept_ranges and self.cache_end == 0:
             raise ValueError("Server does not support HTTP byte ranges")
 
+    def _open_disk_cache(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+        validator = self._etag or self._last_modified
+        # without a validator a cached chunk could silently belong to an older version
+        if self._cache_dir is None or not validator or not self._accept_ranges:
+            return
+        self._disk = _DiskCache.open(
+            self._cache_dir, self.url, validator, self.size, self.chunk_size
+        )
+
     def _chunk_bounds(self, pos: int) -> Tuple[int, int]:
-        start = (pos // self.chunk_size) * self.chunk_size
-        end = min(start + self.chunk_size - 1, self.size - 1)
+        mask = self._chunk_mask
+        if mask is not None:
+            start = pos & ~mask
+            end = min(pos | mask, self.size - 1)
+        else:
+            start = pos - pos % self.chunk_size
+            end = min(start + self.chunk_size, self.size) - 1
         return start, end
 
-    def _headers_for_range(self, start: int, end: int) -> dict:
-        headers = {**self._base_headers, "Range": f"bytes={start}-{end}"}
-        if self._etag:
+    def _build_range_headers(self) -> None:
+        """(Re)build the ranged-GET header template; call whenever validators change."""
+        headers = dict(self._base_headers)
+        # If-Range needs a strong validator (RFC 9110 13.1.5): skip weak ETags
+        if self._etag and not self._etag.startswith("W/"):
             headers["If-Range"] = self._etag
         elif self._last_modified:
             headers["If-Range"] = self._last_modified
+        self._range_headers = headers
+
+    def _headers_for_range(self, start: int, end: int, private: bool = False) -> dict:
+        return self._headers_for_spec(f"bytes={start}-{end}", private)
+
+    def _headers_for_spec(self, spec: str, private: bool = False) -> dict:
+        # Reader-thread calls reuse the template in place (every transport copies
+        # headers into its own request object); worker threads get a copy.
+        if private:
+            return {**self._range_headers, "Range": spec}
+        headers = self._range_headers
+        headers["Range"] = spec
         return headers
 
-    def _range_get(self, start: int, end: int) -> bytes:
-        r = self.s.get(self.url, headers=self._headers_for_range(start, end), timeout=self.timeout)
-        if r.status_code == 416:
-            return b""
-        r.raise_for_status()
-        if r.status_code == 200:
-            body = r.content
-            self.size = max(self.size, len(body))
-            return body
-        return r.content
-
-    def _install_chunk(self, start: int, blob: bytes) -> None:
+    def _range_get(self, start: int, end: int, private_headers: bool = False) -> _Blob:
+        headers = self._headers_for_range(start, end, private_headers)
+        conditional = "If-Range" in headers
+        r = self._request("GET", headers)
+        try:
+            if r.status == 416:
+                return b""
+            r.raise_for_status()
+            if r.status == 200 and self._accept_ranges:
+                if not conditional:
+                    raise HTTPRangeError(r.status, self.url, "server ignored Range")
+                # If-Range mismatch: the resource changed. Don't download it
+                # whole; adopt the new validators and ask for the range again.
+                self._revalidate(r)
+            else:
+                body = r.read_exact()
+                if r.status == 200:
+                    self.size = max(self.size, len(body))
+                return body
+        finally:
+            r.close()
+        headers = self._headers_for_range(start, end, private_headers)
+        conditional = "If-Range" in headers
+        r = self._request("GET", headers)
+        try:
+            if r.status == 416:
+                return b""
+            r.raise_for_status()
+            if r.status == 200 and not conditional:
+                raise HTTPRangeError(r.status, self.url, "server ignored Range")
+            if r.status == 200:
+                raise StaleResourceError(f"{self.url} changed and the server ignores If-Range")
+            return r.read_exact()
+        finally:
+            r.close()
+
+    def _revalidate(self, r: _Response) -> None:
+        """Take validators and size from a full (200) response without reading its body."""
+        self._etag = r.headers.get("ETag")
+        self._last_modified = r.headers.get("Last-Modified")
+        length = r.body_length()
+        if length:
+            self.size = length
+        self._build_range_headers()
+        self._generation += 1
+
+    def _range_get_multi(self, ranges: List[Tuple[int, int]]) -> List[Tuple[int, bytes]]:
+        """
+        Fetch several inclusive ranges in one ``Range: bytes=a-b,c-d`` request.
+        Returns [(start, blob), ...]; an empty list means the server would not
+        serve ranges here and the caller should fall back to single GETs.
+        """
+        spec = "bytes=" + ",".join(f"{a}-{b}" for a, b in ranges)
+        r = self._request("GET", self._headers_for_spec(spec))
+        try:
+            if r.status != 206:
+                if r.status != 200:
+                    r.raise_for_status()
+                return []
+            ctype = r.headers.get("Content-Type", "")
+            if ctype.lower().startswith("multipart/byteranges"):
+                m = _BOUNDARY_RE.search(ctype)
+                if not m:
+                    return []
+                return _parse_byteranges(r.read(), m.group(1))
+            # server merged everything into a single range
+            crange = _parse_content_range(r.headers.get("Content-Range"))
+            if crange is None:
+                return []
+            return [(crange[0], r.read())]
+        finally:
+            r.close()
+
+    def _coalesce_misses(self, first: int, last: int) -> None:
+        """Warm the LRU for [first, last] with one multi-range GET if >1 chunk is missing."""
+        cs = self.chunk_size
+        missing = []
+        cached = 0
+        self._drain_ready()
+        tail_start = self._tail[0] if self._tail is not None else self.size
+        for start in range(self._chunk_bounds(first)[0], last + 1, cs):
+            if start in self._lru:
+                cached += 1
+                continue
+            if start in self._inflight or start >= tail_start:
+                continue
+            if self._disk is not None and start in self._disk:
+                continue
+            if not (self.cache_start <= start < self.cache_end):
+                missing.append(start)
+        # never warm more than the LRU can hold next to the span's cached chunks,
+        # or the warmed (or cached) chunks get evicted before the copy reaches them
+        del missing[max(self._lru.room - cached, 0):]
+        if len(missing) < 2:
+            return
+        # merge adjacent chunks into runs: one range spec entry per run
+        ranges: List[Tuple[int, int]] = []
+        for start in missing:
+            end = min(start + cs, self.size) - 1
+            if ranges and ranges[-1][1] + 1 == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        for pstart, blob in self._range_get_multi(ranges):
+            for start in missing:
+                off = start - pstart
+                if 0 <= off < len(blob):
+                    piece = blob[off:off + cs]
+                    if len(piece) == min(cs, self.size - start):
+                        self._store(start, piece)
+
+    def _set_window(self, start: int, blob: _Blob) -> None:
         self.cache = blob
         self.cache_start = start
         self.cache_end = start + len(blob)
-        with self._lock:
-            self._lru[start] = blob
-            self._lru.move_to_end(start)
-            while len(self._lru) > 2:
-                self._lru.popitem(last=False)
 
-    def _fetch_chunk(self, pos: int) -> None:
-        start, end = self._chunk_bounds(pos)
-        # warmed next?
-        with self._lock:
-            future = self._next_future
-        if future is not None and future.done():
+    def _store(self, start: int, blob: _Blob) -> None:
+        self._lru.put(start, blob)
+        if self._disk is not None:
             try:
-                nstart, nblob = future.result()
-                if nstart == start:
-                    self._install_chunk(nstart, nblob)
-                    self._queue_prefetch(self.cache_end)
-                    with self._lock:
-                        self._next_future = None
-                    return
-            except Exception:
-                with self._lock:
-                    self._next_future = None
-        # LRU hit?
-        with self._lock:
-            hit = self._lru.get(start)
-            if hit is not None:
-                self._lru.move_to_end(start)
+                self._disk.put(start, blob)
+            except OSError as e:
+                # the disk cache is optional: keep reading from the network
+                warnings.warn(f"disabling cache_dir after a write error: {e}", RuntimeWarning)
+                try:
+                    self._disk.close()
+                except OSError:
+                    pass
+                self._disk = None
+
+    def _install_chunk(self, start: int, blob: _Blob) -> None:
+        self._set_window(start, blob)
+        self._store(start, blob)
+        self._lru.get(start)  # this install is the chunk's first use
+
+    def _miss(self, pos: int) -> Tuple[_Blob, int, int]:
+        self._fetch_chunk(pos)
+        return self.cache, self.cache_start, self.cache_end
+
+    def _drain_ready(self) -> None:
+        """Move chunks finished by prefetch workers into the (reader-owned) LRU."""
+        ready = self._ready
+        while not ready.empty():
+            start, blob, gen = ready.get_nowait()
+            if gen == self._cache_generation:
+                self._store(start, blob)
+
+    def _flush_stale(self) -> None:
+        """Drop every chunk cached before the resource changed."""
+        self._lru.clear()
+        self._tail = None
+        self._set_window(0, b"")
+        self._cache_generation = self._generation
+        self._open_disk_cache()  # re-keyed by the new validator
+
+    def _fetch_chunk(self, pos: int) -> None:
+        # _chunk_bounds inlined: this runs on every chunk crossing
+        mask = self._chunk_mask
+        if mask is not None:
+            start = pos & ~mask
+            end = min(pos | mask, self.size - 1)
+        else:
+            start = pos - pos % self.chunk_size
+            end = min(start + self.chunk_size, self.size) - 1
+        if self._generation != self._cache_generation:
+            self._flush_stale()
+        self._drain_ready()
+        hit = self._lru.get(start)
+        tail = self._tail
+        if hit is None and tail is not None and pos >= tail[0]:
+            self._set_window(tail[0], tail[1])
+            return
+        from_disk = False
+        if hit is None and self._disk is not None:
+            hit = self._disk.get(start)
+            from_disk = hit is not None
+        if hit is None and start in self._inflight:
+            # in flight: block on it rather than issuing a duplicate GET
+            with self._prefetch_lock:
+                slot = self._inflight.pop(start, None)
+            if slot is not None:
+                slot.event.wait()
+                self._drain_ready()
+                hit = self._lru.get(start)
         if hit is not None:
-            self._install_chunk(start, hit)
+            if from_disk:
+                self._install_chunk(start, hit)
+            else:  # the LRU get above already counted this use
+                self._set_window(start, hit)
             self._queue_prefetch(self.cache_end)
             return
         # fetch
         blob = self._range_get(start, end)
+        if self._generation != self._cache_generation:
+            self._flush_stale()
         if start == 0 and not self._accept_ranges and len(blob) == self.size:
             self._install_chunk(0, blob)
             return
@@ -262,26 +1207,43 @@ class HTTPRangeReader(io.RawIOBase):
         self._queue_prefetch(self.cache_end)
 
     def _queue_prefetch(self, next_pos: int) -> None:
-        if not self._prefetch_enabled or self._prefetch_pool is None:
-            return
-        nstart, nend = self._chunk_bounds(next_pos)
-        if nstart >= self.size:
+        """
+        Keep up to ``prefetch_depth`` chunks from ``next_pos`` onwards in flight.
+        During a large read the window stretches over the chunks that read still
+        needs, up to ``max_inflight`` (and one less than the LRU holds, so the
+        results do not evict each other before they are consumed).
+        """
+        if not self._prefetch_enabled or self.closed:
             return
-        with self._lock:
-            if self._next_future is not None and not self._next_future.done():
-                tgt = getattr(self._next_future, "_target_start", None)
-                if tgt == nstart:
-                    return
-                try:
-                    self._next_future.cancel()
-                except Exception:
-                    pass
-            def _task(start: int, end: int):
-                blob = self._range_get(start, end)
-                return start, blob
-            f = self._prefetch_pool.submit(_task, nstart, nend)
-            setattr(f, "_target_start", nstart)
-            self._next_future = f
+        if not self._workers:
+            self._start_workers(self._max_inflight)
+        mask = self._chunk_mask
+        first = next_pos & ~mask if mask is not None else next_pos - next_pos % self.chunk_size
+        window_end = first + self._prefetch_depth * self.chunk_size
+        if self._want_end > window_end:
+            depth = max(min(self._max_inflight, self._lru.room - 1), self._prefetch_depth)
+            window_end = min(self._want_end, first + depth * self.chunk_size)
+        with self._prefetch_lock:
+            self._retire_inflight(first, window_end)
+            for nstart in range(first, min(window_end, self.size), self.chunk_size):
+                if nstart in self._inflight or nstart in self._lru:
+                    continue
+                if self._disk is not None and nstart in self._disk:
+                    continue
+                slot = _Slot(nstart, min(nstart + self.chunk_size, self.size) - 1)
+                self._inflight[nstart] = slot
+                self._task_q.put(slot)
+
+    def _cancel_prefetch_outside(self, pos: int) -> None:
+        """Drop queued read-ahead that no longer covers ``pos``'s chunk or the ones after it."""
+        first, _ = self._chunk_bounds(pos)
+        with self._prefetch_lock:
+            self._retire_inflight(first, first + (self._prefetch_depth + 1) * self.chunk_size)
+
+    def _retire_inflight(self, first: int, window_end: int) -> None:
+        # caller holds _prefetch_lock; slots already running still post to _ready
+        for tgt in [t for t in self._inflight if not (first <= t < window_end)]:
+            self._inflight.pop(tgt).cancelled = True
 
     def __len__(self) -> int:
         return self.size
@@ -1,41 +1,80 @@
+import gc
 import io
 import os
-import types
-from http_range_reader.reader import HTTPRangeReader
+import queue
+import threading
+import time
+
+import pytest
+
+from http_range_reader import reader as reader_mod
+from http_range_reader.reader import (
+    HTTPRangeError,
+    HTTPRangeReader,
+    StaleResourceError,
+    TransportError,
+    _LRU,
+    _SegmentedLRU,
+    _SmallLRU,
+    _Response,
+    _DiskCache,
+    _Slot,
+    _new_lru,
+    _parse_byteranges,
+)
 
 
 class FakeRangeReader(HTTPRangeReader):
     """Subclass that fakes network I/O using an in-memory bytes object."""
-    def __init__(self, data: bytes, chunk_size=1024):
+    def __init__(self, data: bytes, chunk_size=1024, lru_size=8, prefetch_depth=0, max_inflight=0):
         # Bypass parent init; set up minimal state
         self.url = "mem://fake"
         self.chunk_size = int(chunk_size)
+        self._chunk_mask = chunk_size - 1 if chunk_size & (chunk_size - 1) == 0 else None
         self.timeout = 0
         self._external_session = True
-        self.s = None  # unused
+        self._transport = None  # unused
         self._base_headers = {}
+        self._range_headers = {}
         self.pos = 0
         self.size = len(data)
         self._accept_ranges = True
         self._etag = None
         self._last_modified = None
-        self._lru = {}
+        self._generation = 0
+        self._cache_generation = 0
+        self._lru = _new_lru(lru_size)
         self.cache = b""
         self.cache_start = 0
         self.cache_end = 0
-        self._prefetch_enabled = False
-        self._prefetch_pool = None
-        self._next_future = None
-        self._lock = types.SimpleNamespace(__enter__=lambda s: None, __exit__=lambda s,a,b,c: None)
+        self._tail = None
+        self._cache_dir = None
+        self._disk = None
+        self._prefetch_enabled = prefetch_depth > 0
+        self._prefetch_depth = prefetch_depth
+        self._max_inflight = max(max_inflight, prefetch_depth)
+        self._want_end = 0
+        self._inflight = {}
+        self._task_q = queue.SimpleQueue()
+        self._ready = queue.SimpleQueue()
+        self._workers = []
+        self._prefetch_lock = threading.Lock()
         self._data = data
+        self.fetches = []
+        self.multi_fetches = []
 
-    def _range_get(self, start: int, end: int) -> bytes:
+    def _range_get(self, start: int, end: int, private_headers: bool = False) -> bytes:
+        self.fetches.append(start)
         # emulate 206 inclusive range
         end_inclusive = min(end, self.size - 1)
         if start >= self.size:
             return b""
         return self._data[start : end_inclusive + 1]
 
+    def _range_get_multi(self, ranges):
+        self.multi_fetches.append(list(ranges))
+        return [(a, self._data[a : b + 1]) for a, b in ranges]
+
     def _init_remote(self):
         pass  # already initialized above
 
@@ -60,3 +99,427 @@ def test_len_and_seek_clamp():
     assert r.tell() == len(r)
     r.seek(-5)
     assert r.tell() == 0
+
+
+def test_read_spanning_many_chunks():
+    data = bytes(range(256)) * 20
+    r = FakeRangeReader(data, chunk_size=100)
+    r.seek(37)
+    assert r.read(1000) == data[37:1037]
+    r.seek(len(data) - 5)
+    assert r.read(100) == data[-5:]
+    assert r.read(10) == b""
+
+
+def test_readinto_fills_caller_buffer():
+    data = os.urandom(500)
+    r = FakeRangeReader(data, chunk_size=64)
+    r.seek(10)
+    buf = bytearray(200)
+    assert r.readinto(buf) == 200
+    assert bytes(buf) == data[10:210]
+    r.seek(450)
+    assert r.readinto(buf) == 50
+    assert bytes(buf[:50]) == data[450:]
+
+
+@pytest.mark.parametrize("lru_cls", [_LRU, _SmallLRU])
+def test_lru_evicts_least_recently_used(lru_cls):
+    lru = lru_cls(2)
+    lru.put(0, b"a")
+    lru.put(1, b"b")
+    assert lru.get(0) == b"a"
+    lru.put(2, b"c")
+    assert 1 not in lru
+    assert lru.get(0) == b"a" and lru.get(2) == b"c"
+    assert len(lru) == 2
+
+
+def test_read1_stops_at_chunk_end():
+    data = os.urandom(64 * 3 + 10)
+    r = FakeRangeReader(data, chunk_size=64)
+    r.seek(10)
+    assert r.read1() == data[10:64]
+    assert r.read1(5) == data[64:69]
+    assert r.read1(100) == data[69:128]
+    r.seek(0)
+    r._set_window(0, bytearray(data[:64]))  # chunks from read_exact are bytearrays
+    assert type(r.read1(8)) is bytes
+    assert r.fetches == [0, 64]
+    r.seek(195)
+    assert r.read1(-1) == data[195:] and r.read1() == b""
+
+
+def test_segmented_lru_protects_chunks_hit_twice_from_scans():
+    lru = _SegmentedLRU(4)
+    lru.put(0, b"cd")
+    lru.get(0)
+    lru.get(0)  # second hit: promoted to the protected segment
+    for key in range(1, 20):  # sequential scan, each chunk stored and read once
+        lru.put(key, b"x")
+        assert lru.get(key) == b"x"
+    assert lru.get(0) == b"cd"
+    assert len(lru) == 4 and lru.room == 3
+    lru.clear()
+    assert len(lru) == 0 and lru.room == 4
+
+
+def _scan(r, first, last):
+    for pos in range(first, last, 64):
+        r.seek(pos)
+        r.read(64)
+
+
+def test_directly_fetched_chunk_accessed_twice_survives_scan():
+    data = os.urandom(64 * 20)
+    r = FakeRangeReader(data, chunk_size=64, lru_size=4)
+    r.read(1)  # fetched and used: first access
+    r.seek(64)
+    r.read(1)
+    r.seek(0)
+    r.read(1)  # second access: protected
+    _scan(r, 128, len(data))
+    r.seek(0)
+    r.read(1)
+    assert r.fetches.count(0) == 1
+
+
+def test_prefetched_chunk_accessed_twice_survives_scan():
+    data = os.urandom(64 * 20)
+    r = FakeRangeReader(data, chunk_size=64, lru_size=4, prefetch_depth=1)
+    with r:
+        r.read(1)
+        r.seek(64)
+        r.read(1)  # prefetched chunk 64: first access
+        r.seek(0)
+        r.read(1)
+        r.seek(64)
+        r.read(1)  # second access: protected
+        _scan(r, 128, len(data))
+        r.seek(64)
+        r.read(1)
+    assert r.fetches.count(64) == 1
+
+
+def test_chunk_accessed_once_is_evicted_by_scan():
+    data = os.urandom(64 * 20)
+    r = FakeRangeReader(data, chunk_size=64, lru_size=4)
+    r.read(1)
+    _scan(r, 64, len(data))
+    r.seek(0)
+    r.read(1)
+    assert r.fetches.count(0) == 2
+
+
+def test_segmented_lru_demotes_protected_overflow_to_probation():
+    lru = _SegmentedLRU(4)
+    for key in (0, 1, 2):
+        lru.put(key, bytes([key]))
+        lru.get(key)
+        lru.get(key)
+    # protected holds 2: key 0 was demoted, not dropped
+    assert 0 in lru and lru.room == 2
+    lru.put(3, b"3")
+    lru.put(4, b"4")
+    assert 0 not in lru and 1 in lru and 2 in lru
+
+
+def test_zip_like_access_hits_cache():
+    data = os.urandom(64 * 10)
+    r = FakeRangeReader(data, chunk_size=64, lru_size=4)
+    for _ in range(3):
+        for pos in (600, 300, 0):  # EOCD, central directory, local header
+            r.seek(pos)
+            assert r.read(16) == data[pos : pos + 16]
+    assert sorted(r.fetches) == [0, 256, 576]
+
+
+def test_parse_multipart_byteranges():
+    payload_a = b"--BOUND\r\n--BOUND--"  # boundary-lookalike inside payload
+    payload_b = b"xyz"
+    body = (
+        b"--BOUND\r\nContent-Type: application/zip\r\nContent-Range: bytes 0-17/100\r\n\r\n"
+        + payload_a
+        + b"\r\n--BOUND\r\nContent-Range: bytes 50-52/100\r\n\r\n"
+        + payload_b
+        + b"\r\n--BOUND--\r\n"
+    )
+    assert _parse_byteranges(body, "BOUND") == [(0, payload_a), (50, payload_b)]
+
+
+def test_spanning_read_coalesces_missing_chunks():
+    data = os.urandom(64 * 8)
+    r = FakeRangeReader(data, chunk_size=64)
+    r.seek(64)
+    r.read(10)  # chunk 64 cached; 128.. missing
+    r.seek(0)
+    assert r.read(64 * 4) == data[: 64 * 4]
+    assert r.multi_fetches == [[(0, 63), (128, 255)]]
+    assert r.fetches == [64]
+
+
+def test_coalesced_warmup_leaves_room_for_cached_chunks():
+    data = os.urandom(64 * 12)
+    r = FakeRangeReader(data, chunk_size=64, lru_size=8)
+    r.seek(64)
+    r.read(64 * 3)  # chunks 1-3 cached
+    r.seek(0)
+    assert r.read(64 * 12) == data
+    fetched = list(r.fetches)
+    for ranges in r.multi_fetches:
+        for a, b in ranges:
+            fetched.extend(range(a, b + 1, 64))
+    assert sorted(fetched) == list(range(0, len(data), 64))
+
+
+def test_pipelined_prefetch_sequential_read():
+    data = os.urandom(64 * 20 + 7)
+    r = FakeRangeReader(data, chunk_size=64, prefetch_depth=3)
+    with r:
+        out = b"".join(iter(lambda: r.read(50), b""))
+    assert out == data
+    # every chunk fetched exactly once, whether by the reader or a prefetch worker
+    assert sorted(r.fetches) == list(range(0, len(data), 64))
+
+
+def test_tail_prefetch_serves_end_of_file():
+    data = os.urandom(64 * 10 + 30)
+    r = FakeRangeReader(data, chunk_size=64)
+    tail_start = len(data) - 100
+    r._tail = (tail_start, data[tail_start:])
+    r.seek(-22, io.SEEK_END)
+    assert r.read(22) == data[-22:]
+    r.seek(tail_start)
+    assert r.read() == data[tail_start:]
+    assert r.fetches == []
+    r.seek(tail_start - 10)
+    assert r.read(20) == data[tail_start - 10 : tail_start + 10]
+    assert r.fetches == [512]
+
+
+def test_seek_cancels_prefetch_outside_window():
+    data = os.urandom(64 * 20)
+    r = FakeRangeReader(data, chunk_size=64)
+    r._prefetch_depth = 2
+    slots = {start: _Slot(start, start + 63) for start in (128, 192, 256)}
+    r._inflight.update(slots)
+    r.seek(130)  # still inside [128, 128 + 3 chunks): nothing cancelled
+    assert set(r._inflight) == {128, 192, 256}
+    r.seek(10)  # backward seek: window is [0, 192)
+    assert set(r._inflight) == {128}
+    assert slots[192].cancelled and slots[256].cancelled
+    assert not slots[128].cancelled
+
+
+class ScriptedTransport:
+    """Replays canned (status, headers, body) responses and records request headers."""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def request(self, method, url, headers, timeout):
+        self.sent.append(dict(headers))
+        status, hdrs, body = self.responses.pop(0)
+        raw = io.BytesIO(body)
+        return _Response(status, hdrs, url, raw, raw.read, raw.close)
+
+    def close(self):
+        pass
+
+
+def test_truncated_range_body_raises():
+    raw = io.BytesIO(b"x" * 50)
+    r = _Response(206, {"Content-Range": "bytes 0-99/1000"}, "mem://", raw, raw.read, raw.close)
+    with pytest.raises(TransportError):
+        r.read_exact()
+
+
+def test_if_range_mismatch_revalidates_and_retries_range():
+    new = os.urandom(300)
+    r = FakeRangeReader(b"x" * 300, chunk_size=64)
+    r._etag = '"v1"'
+    r._build_range_headers()
+    r._accept_ranges = True
+    r._transport = ScriptedTransport(
+        (200, {"ETag": '"v2"', "Content-Length": "300"}, new),
+        (206, {"Content-Range": "bytes 64-127/300"}, new[64:128]),
+    )
+    assert HTTPRangeReader._range_get(r, 64, 127) == new[64:128]
+    assert [h["If-Range"] for h in r._transport.sent] == ['"v1"', '"v2"']
+    assert r._generation == 1
+
+
+def test_if_range_still_ignored_raises_stale():
+    r = FakeRangeReader(b"x" * 300, chunk_size=64)
+    r._etag = '"v1"'
+    r._build_range_headers()
+    r._transport = ScriptedTransport(
+        (200, {"ETag": '"v2"', "Content-Length": "300"}, b"y" * 300),
+        (200, {"ETag": '"v3"', "Content-Length": "300"}, b"z" * 300),
+    )
+    with pytest.raises(StaleResourceError):
+        HTTPRangeReader._range_get(r, 0, 63)
+
+
+def test_open_uses_one_suffix_get():
+    data = os.urandom(300)
+    r = FakeRangeReader(data, chunk_size=64)
+    r._tail_prefetch_bytes = 100
+    r._transport = ScriptedTransport(
+        (206, {"Content-Range": "bytes 200-299/300", "ETag": '"v1"'}, data[200:]),
+    )
+    HTTPRangeReader._init_remote(r)
+    assert [h["Range"] for h in r._transport.sent] == ["bytes=-100"]
+    assert "If-Range" not in r._transport.sent[0]
+    assert r.size == 300 and r._etag == '"v1"' and r._range_headers["If-Range"] == '"v1"'
+    assert r._tail == (200, data[200:])
+
+
+def test_open_falls_back_to_head_when_suffix_get_ignored():
+    data = os.urandom(300)
+    r = FakeRangeReader(data, chunk_size=64)
+    r._tail_prefetch_bytes = 0
+    r._transport = ScriptedTransport(
+        (200, {"Content-Length": "300"}, data),
+        (200, {"Content-Length": "300", "Accept-Ranges": "bytes", "ETag": '"v1"'}, b""),
+    )
+    HTTPRangeReader._init_remote(r)
+    assert [h.get("Range") for h in r._transport.sent] == ["bytes=-1", None]
+    assert r.size == 300 and r._accept_ranges and r._tail is None
+
+
+def test_weak_etag_is_not_sent_as_if_range():
+    r = FakeRangeReader(b"x" * 300, chunk_size=64)
+    r._etag = 'W/"v1"'
+    r._last_modified = "Tue, 01 Sep 2026 00:00:00 GMT"
+    r._build_range_headers()
+    assert r._range_headers["If-Range"] == r._last_modified
+    r._last_modified = None
+    r._build_range_headers()
+    assert "If-Range" not in r._range_headers
+
+
+def test_200_without_if_range_is_not_treated_as_a_change():
+    r = FakeRangeReader(b"x" * 300, chunk_size=64)
+    r._build_range_headers()  # no validators: no If-Range
+    r._transport = ScriptedTransport((200, {"Content-Length": "300"}, b"x" * 300))
+    with pytest.raises(HTTPRangeError, match="ignored Range"):
+        HTTPRangeReader._range_get(r, 0, 63)
+    assert r._generation == 0
+
+
+def test_rejected_suffix_get_is_not_repeated_for_the_tail():
+    data = os.urandom(300)
+    r = FakeRangeReader(data, chunk_size=64)
+    r._tail_prefetch_bytes = 100
+    r._transport = ScriptedTransport(
+        (200, {"Content-Length": "300"}, data),
+        (200, {"Content-Length": "300", "Accept-Ranges": "bytes"}, b""),
+    )
+    HTTPRangeReader._init_remote(r)
+    assert [h.get("Range") for h in r._transport.sent] == ["bytes=-100", None]
+    assert r._accept_ranges and r._tail is None
+
+
+def test_generation_bump_flushes_cached_chunks():
+    data = os.urandom(64 * 4)
+    r = FakeRangeReader(data, chunk_size=64)
+    r.read(64 * 2)
+    assert 0 in r._lru
+    r._generation += 1
+    r.seek(200)
+    r.read(1)  # next miss flushes everything cached under the old generation
+    assert 0 not in r._lru and 64 not in r._lru and 192 in r._lru
+    assert r._cache_generation == 1
+
+
+def test_disk_cache_serves_chunks_across_readers(tmp_path):
+    data = os.urandom(64 * 5 + 10)
+    first = FakeRangeReader(data, chunk_size=64)
+    first._disk = _DiskCache.open(str(tmp_path), first.url, '"v1"', len(data), 64)
+    assert first.read() == data
+    first._disk.close()
+
+    second = FakeRangeReader(data, chunk_size=64)
+    second._disk = _DiskCache.open(str(tmp_path), second.url, '"v1"', len(data), 64)
+    assert second.read() == data
+    assert second.fetches == []
+    second._disk.close()
+
+    changed = FakeRangeReader(data, chunk_size=64)
+    changed._disk = _DiskCache.open(str(tmp_path), changed.url, '"v2"', len(data), 64)
+    changed.read(10)
+    assert changed.fetches == [0]
+    changed._disk.close()
+
+
+def test_disk_cache_write_error_falls_back_to_network(tmp_path, monkeypatch):
+    data = os.urandom(64 * 5)
+    r = FakeRangeReader(data, chunk_size=64)
+    r._disk = _DiskCache.open(str(tmp_path), r.url, '"v1"', len(data), 64)
+
+    def enospc(*args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "pwrite", enospc)
+    with pytest.warns(RuntimeWarning, match="cache_dir"):
+        assert r.read(64 * 3) == data[: 64 * 3]
+    assert r._disk is None
+    assert r.read() == data[64 * 3:]
+
+
+class SlowFakeRangeReader(FakeRangeReader):
+    """Each GET takes a few ms; records how many ran at once."""
+    def __init__(self, *args, **kwargs):
+        self._active = 0
+        self.peak = 0
+        self._count_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _range_get(self, start, end, private_headers=False):
+        with self._count_lock:
+            self._active += 1
+            self.peak = max(self.peak, self._active)
+        time.sleep(0.005)
+        try:
+            return super()._range_get(start, end, private_headers)
+        finally:
+            with self._count_lock:
+                self._active -= 1
+
+
+def test_large_read_fetches_chunks_in_parallel():
+    data = os.urandom(64 * 12)
+    r = SlowFakeRangeReader(data, chunk_size=64, prefetch_depth=1, max_inflight=4)
+    with r:
+        assert r.read(64 * 10) == data[: 64 * 10]
+    assert r.peak > 1
+    assert len(r.fetches) == len(set(r.fetches))
+
+
+def _prefetch_threads():
+    return {t for t in threading.enumerate() if t.name.startswith("hrr-prefetch")}
+
+
+def test_failed_open_leaves_no_worker_threads(monkeypatch):
+    before = _prefetch_threads()
+    monkeypatch.setattr(
+        reader_mod, "_Urllib3Transport", lambda *a, **kw: ScriptedTransport((404, {}, b""))
+    )
+    for _ in range(3):
+        with pytest.raises(HTTPRangeError):
+            HTTPRangeReader("http://example.invalid/x.zip")
+    assert _prefetch_threads() == before
+
+
+def test_unclosed_reader_is_collected_and_stops_workers():
+    data = os.urandom(64 * 8)
+    r = FakeRangeReader(data, chunk_size=64, prefetch_depth=2)
+    r.read(10)
+    workers = list(r._workers)
+    assert workers
+    del r
+    gc.collect()
+    for t in workers:
+        t.join(timeout=2)
+    assert not any(t.is_alive() for t in workers)
@@ -0,0 +1,243 @@
+import os
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_range_reader import HTTPRangeReader, TransportError
+from http_range_reader.reader import (
+    _HttpxTransport,
+    _parse_byteranges,
+    _RequestsTransport,
+    _Urllib3Transport,
+)
+
+DATA = os.urandom(20 * 1024 * 1024)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Serves DATA with single and multi-range (multipart/byteranges) support.
+    ``/chunked`` answers every GET with a chunked (unknown-length) 200;
+    ``/short`` sends the usual headers but only 100 bytes of body.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", self.path, None))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(DATA)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, self.headers.get("Range")))
+        if self.path == "/chunked":
+            self._send_chunked()
+            return
+        status, headers, body = self._payload(self.headers.get("Range"))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.path == "/short":
+            body = body[:100]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def _payload(self, spec):
+        if not spec:
+            return 200, {}, DATA
+        ranges = []
+        for part in spec[len("bytes="):].split(","):
+            a, _, b = part.strip().partition("-")
+            if not a:
+                ranges.append((len(DATA) - int(b), len(DATA) - 1))
+            else:
+                ranges.append((int(a), min(int(b), len(DATA) - 1)))
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            return 206, {"Content-Range": f"bytes {start}-{end}/{len(DATA)}"}, DATA[start:end + 1]
+        body = b"".join(
+            b"--BOUND\r\nContent-Range: bytes %d-%d/%d\r\n\r\n%s\r\n"
+            % (start, end, len(DATA), DATA[start:end + 1])
+            for start, end in ranges
+        )
+        headers = {"Content-Type": "multipart/byteranges; boundary=BOUND"}
+        return 206, headers, body + b"--BOUND--\r\n"
+
+    def _send_chunked(self):
+        self.send_response(200)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        step = 64 * 1024
+        try:
+            for off in range(0, len(DATA), step):
+                piece = DATA[off:off + step]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                self.server.sent += len(piece)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            self.server.done.set()
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.daemon_threads = True
+    srv.connections = 0
+    srv.requests = []
+    srv.sent = 0
+    srv.done = threading.Event()
+    thread = threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _urllib3():
+    return _Urllib3Transport(max_retries=0, backoff=0, maxsize=2)
+
+
+def _requests():
+    requests = pytest.importorskip("requests")
+    return _RequestsTransport(requests.Session(), max_retries=0, backoff=0, owned=True)
+
+
+def _httpx():
+    pytest.importorskip("httpx")
+    pytest.importorskip("h2")
+    return _HttpxTransport(max_retries=0)
+
+
+@pytest.fixture(params=[_urllib3, _requests, _httpx], ids=["urllib3", "requests", "httpx2"])
+def transport(request):
+    t = request.param()
+    yield t
+    t.close()
+
+
+def test_range_206_is_read_exactly(server, transport):
+    r = transport.request("GET", server.url + "/f", {"Range": "bytes=10-70009"}, 5)
+    assert r.status == 206 and r.body_length() == 70000
+    assert r.read_exact() == DATA[10:70010]
+    r.close()
+
+
+def test_multipart_byteranges_reply(server, transport):
+    r = transport.request("GET", server.url + "/f", {"Range": "bytes=0-9,1000-1009"}, 5)
+    assert r.status == 206
+    assert r.headers.get("Content-Type").startswith("multipart/byteranges")
+    assert _parse_byteranges(r.read(), "BOUND") == [(0, DATA[:10]), (1000, DATA[1000:1010])]
+    r.close()
+
+
+def test_unknown_length_200_is_read_whole(server, transport):
+    r = transport.request("GET", server.url + "/chunked", {}, 5)
+    assert r.status == 200 and r.body_length() is None
+    assert r.read_exact() == DATA
+    r.close()
+
+
+def test_short_body_raises_oserror(server, transport):
+    r = transport.request("GET", server.url + "/short", {"Range": "bytes=0-9999"}, 5)
+    assert r.status == 206
+    with pytest.raises(OSError):
+        r.read_exact()
+    r.close()
+
+
+def _reader_kwargs(name):
+    if name == "requests":
+        return {"session": pytest.importorskip("requests").Session()}
+    if name == "httpx2":
+        pytest.importorskip("httpx")
+        pytest.importorskip("h2")
+        return {"transport": "httpx2"}
+    return {}
+
+
+@pytest.mark.parametrize("name", ["urllib3", "requests", "httpx2"])
+def test_reader_end_to_end(server, name):
+    cs = 64 * 1024
+    kwargs = _reader_kwargs(name)
+    with HTTPRangeReader(server.url + "/f", chunk_size=cs, prefetch=False, **kwargs) as r:
+        assert r.size == len(DATA)
+        r.seek(5)
+        assert r.read(10) == DATA[5:15]
+        r.seek(cs * 3)
+        r.read(1)
+        r.seek(cs * 2 - 7)  # chunks 1, 2 and 4 missing around cached chunk 3
+        assert r.read(cs * 3) == DATA[cs * 2 - 7:cs * 5 - 7]
+        r.seek(-20, 2)
+        assert r.read() == DATA[-20:]
+    ranges = [rng for method, _, rng in server.requests if method == "GET"]
+    assert ranges[0] == "bytes=-65536"  # one suffix GET opens the reader
+    assert f"bytes={cs}-{cs * 3 - 1},{cs * 4}-{cs * 5 - 1}" in ranges  # one multi-range GET
+
+
+def test_urllib3_unread_unknown_length_body_is_not_downloaded(server):
+    t = _Urllib3Transport(max_retries=0, backoff=0, maxsize=2)
+    r = t.request("GET", server.url + "/chunked", {}, 5)
+    assert r.status == 200 and r.body_length() is None
+    r.close()
+    assert server.done.wait(5)
+    assert server.sent < len(DATA) // 2
+    t.close()
+
+
+def test_urllib3_reuses_connection_after_head(server):
+    t = _Urllib3Transport(max_retries=0, backoff=0, maxsize=2)
+    h = t.request("HEAD", server.url + "/f", {}, 5)
+    h.close()
+    r = t.request("GET", server.url + "/f", {}, 5)
+    assert len(r.read_exact()) == len(DATA)
+    r.close()
+    t.close()
+    assert server.connections == 1
+    assert [m for m, _, _ in server.requests] == ["HEAD", "GET"]
+
+
+def test_urllib3_reuses_connection_after_fully_read_chunked_body(server):
+    t = _Urllib3Transport(max_retries=0, backoff=0, maxsize=2)
+    r = t.request("GET", server.url + "/chunked", {}, 5)
+    assert r.read_exact() == DATA
+    r.close()
+    r = t.request("HEAD", server.url + "/f", {}, 5)
+    r.close()
+    t.close()
+    assert server.connections == 1
+
+
+def test_urllib3_connection_failure_is_an_oserror():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    t = _Urllib3Transport(max_retries=0, backoff=0, maxsize=2)
+    with pytest.raises(TransportError) as exc:
+        t.request("GET", f"http://127.0.0.1:{port}/", {}, 5)
+    assert isinstance(exc.value, OSError)
+    t.close()
+
+
+def test_urllib3_truncated_body_is_an_oserror(server):
+    t = _Urllib3Transport(max_retries=0, backoff=0, maxsize=2)
+    r = t.request("GET", server.url + "/short", {}, 5)
+    with pytest.raises(OSError):
+        r.read_exact()
+    r.close()
+    t.close()